@@ -0,0 +1,78 @@
+import multiprocessing
+import random
+import numpy as np
+import Queue
+
+from gridworld import VectorGridWorld
+from inference import NumpyNetwork
+
+
+def exploration_rate(params, frame):
+    frame = min(frame, params['exploration_rate_decay'])
+
+    return params['initial_exploration_rate'] + frame * \
+        (params['final_exploration_rate'] - params['initial_exploration_rate']) / \
+        float(params['exploration_rate_decay'])
+
+
+class Actor(multiprocessing.Process):
+    def __init__(self, index, params, entities, transitions, weights, frame_counter, stop, levels=None):
+        multiprocessing.Process.__init__(self)
+
+        self.daemon = True
+        self.index = index
+        self.params = params
+        self.entities = entities
+        self.transitions = transitions
+        self.weights = weights
+        self.frame_counter = frame_counter
+        self.stop = stop
+        self.levels = levels
+
+    def run(self):
+        if self.params.get('seed') is None:
+            random.seed()
+            np.random.seed()
+        else:
+            random.seed(self.params['seed'] + self.index + 1)
+            np.random.seed(self.params['seed'] + self.index + 1)
+
+        environments = VectorGridWorld.from_params(self.params, self.entities, levels=self.levels)
+        network = NumpyNetwork(self.weights.get())
+        states = environments.state()
+
+        while not self.stop.is_set():
+            try:
+                network.set_weights(self.weights.get_nowait())
+            except Queue.Empty:
+                pass
+
+            with self.frame_counter.get_lock():
+                frame = self.frame_counter.value
+                self.frame_counter.value += environments.size
+
+            if frame >= self.params['frames']:
+                break
+
+            actions = np.argmax(network.output(states), axis=1)
+            explore = np.random.random(environments.size) <= exploration_rate(self.params, frame)
+            actions[explore] = np.random.randint(self.params['actions'], size=np.sum(explore))
+
+            rewards, terminals, next_states = environments.act(actions)
+            finished = [(total_reward, t) for _, total_reward, t in environments.finished]
+
+            self.put((self.index, states[:, :, :, -1].astype(np.uint8), actions, rewards, terminals, finished))
+
+            if len(finished) > 0:
+                states = environments.state()
+            else:
+                states = next_states
+
+    def put(self, message):
+        while not self.stop.is_set():
+            try:
+                self.transitions.put(message, timeout=1.0)
+
+                return
+            except Queue.Full:
+                continue
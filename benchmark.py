@@ -0,0 +1,216 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+import numpy as np
+
+from gridworld import *
+from replay import ReplayMemory
+from inference import NumpyNetwork
+
+
+SECTIONS = ['gridworld', 'replay', 'network', 'trainer', 'startup']
+WORKER_MODULES = ['gridworld', 'levels', 'actor', 'inference', 'replay', 'solver', 'evaluate', 'trainer']
+HEAVY_MODULES = ['tensorflow', 'pygame', 'matplotlib', 'pandas', 'seaborn']
+STARTUP_SCRIPT = '''
+import json, resource, sys, time
+start = time.time()
+import %s
+print json.dumps({'seconds': time.time() - start, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'heavy_modules': [module for module in %r if module in sys.modules]})
+'''
+
+
+def rate(function, duration=1.0):
+    count = 0
+    start = time.time()
+
+    while time.time() - start < duration:
+        function()
+        count += 1
+
+    return count / (time.time() - start)
+
+
+def benchmark_gridworld(params, duration):
+    results = {}
+
+    for world_path in sorted(glob.glob('world_*.json')):
+        entities = load_entities(world_path)
+        world_results = {
+            'generate_per_second': rate(lambda: GridWorld.generate(entities, params['width'], params['height']),
+                                        duration)
+        }
+
+        for world_class in [GridWorld, CompactGridWorld]:
+            def construct():
+                return world_class(entities=entities, width=params['width'], height=params['height'],
+                                   memory=params['memory'])
+
+            worlds = [construct()]
+
+            def step():
+                if worlds[0].terminal() or worlds[0].t() >= params['episode_length']:
+                    worlds[0] = construct()
+
+                worlds[0].act(random.randrange(params['actions']))
+                worlds[0].state()
+
+            world_results[world_class.__name__] = {
+                'construct_per_second': rate(construct, duration),
+                'steps_per_second': rate(step, duration)
+            }
+
+        results[world_path] = world_results
+
+    return results
+
+
+def benchmark_replay(params, duration, batch_size=32):
+    replay_memory = ReplayMemory(params['replay_memory_size'], params['width'], params['height'], params['memory'],
+                                 codec=params.get('state_codec', 'uint8'))
+    frame = np.random.randint(0, 12, size=[params['width'], params['height']])
+
+    def append():
+        replay_memory.append(frame, random.randrange(params['actions']), random.random(), random.random() < 0.01)
+
+    results = {'size': params['replay_memory_size'], 'codec': params.get('state_codec', 'uint8'),
+               'bytes': replay_memory.frames.nbytes, 'append_per_second': rate(append, duration)}
+
+    while len(replay_memory) < min(params['replay_memory_size'], 100000):
+        append()
+
+    results['filled'] = len(replay_memory)
+    results['sample_per_second'] = rate(lambda: replay_memory.sample(batch_size), duration)
+    results['batch_size'] = batch_size
+
+    return results
+
+
+def benchmark_network(params, duration, batch_sizes=(1, 32)):
+    import tensorflow as tf
+    from model import Network
+
+    results = {}
+    shape = [params['width'], params['height'], params['memory']]
+
+    with tf.Graph().as_default(), tf.Session() as session:
+        network = Network(input_shape=shape, output_shape=[params['actions']])
+        session.run(tf.initialize_all_variables())
+        numpy_network = NumpyNetwork()
+        numpy_network.sync(network, session)
+
+        for batch_size in batch_sizes:
+            states = np.random.randint(0, 12, size=[batch_size] + shape).astype(np.float32)
+
+            results['batch_%d' % batch_size] = {
+                'tensorflow_latency': 1.0 / rate(lambda: session.run(network.output,
+                                                                     feed_dict={network.state: states}), duration),
+                'numpy_latency': 1.0 / rate(lambda: numpy_network.output(states), duration)
+            }
+
+    return results
+
+
+def benchmark_trainer(frames, world_path='world_door.json'):
+    from trainer import Trainer
+
+    model_name = 'benchmark_%d' % os.getpid()
+    overrides = {
+        'frames': frames, 'replay_start': frames // 2, 'replay_memory_size': 10 * frames,
+        'display_step': 10 * frames, 'save_step': 10 * frames, 'plot': False
+    }
+
+    trainer = Trainer(model_name=model_name, world_path=world_path, params=overrides, verbose=False)
+
+    try:
+        start = time.time()
+        trainer.train()
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(trainer.results_path, ignore_errors=True)
+
+    return {'world_path': world_path, 'frames': frames, 'frames_per_second': frames / elapsed}
+
+
+def benchmark_startup(modules=WORKER_MODULES, repeats=3):
+    results = {}
+
+    for module in modules:
+        runs = []
+
+        for _ in range(repeats):
+            try:
+                output = subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT % (module, HEAVY_MODULES)])
+                runs.append(json.loads(output.strip().split('\n')[-1]))
+            except subprocess.CalledProcessError:
+                break
+
+        if len(runs) == 0:
+            results[module] = None
+        else:
+            results[module] = {
+                'seconds': min([run['seconds'] for run in runs]),
+                'max_rss_kb': min([run['max_rss_kb'] for run in runs]),
+                'heavy_modules': runs[0]['heavy_modules']
+            }
+
+    return results
+
+
+def revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', nargs='+', default=SECTIONS, choices=SECTIONS)
+    parser.add_argument('--duration', type=float, default=1.0)
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--replay_memory_size', type=int)
+    parser.add_argument('--output')
+
+    args = parser.parse_args()
+
+    with open('params.json') as f:
+        params = json.load(f)
+
+    if args.replay_memory_size:
+        params['replay_memory_size'] = args.replay_memory_size
+
+    results = {'time': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()), 'host': platform.node(),
+               'revision': revision()}
+
+    if 'gridworld' in args.sections:
+        results['gridworld'] = benchmark_gridworld(params, args.duration)
+
+    if 'replay' in args.sections:
+        results['replay'] = benchmark_replay(params, args.duration)
+
+    if 'network' in args.sections:
+        results['network'] = benchmark_network(params, args.duration)
+
+    if 'trainer' in args.sections:
+        results['trainer'] = benchmark_trainer(args.frames)
+
+    if 'startup' in args.sections:
+        results['startup'] = benchmark_startup()
+
+    output = args.output or os.path.join('benchmarks', '%s.json' % time.strftime('%Y_%m_%d_%H-%M-%S', time.gmtime()))
+
+    if os.path.dirname(output) and not os.path.exists(os.path.dirname(output)):
+        os.makedirs(os.path.dirname(output))
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, separators=(',', ': '), sort_keys=True)
+
+    print json.dumps(results, indent=2, separators=(',', ': '), sort_keys=True)
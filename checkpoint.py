@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import threading
+import Queue
+import numpy as np
+
+
+class Checkpointer(threading.Thread):
+    def __init__(self, path, keep=3, max_pending=1):
+        threading.Thread.__init__(self)
+
+        self.daemon = True
+        self.path = path
+        self.keep = keep
+        self.queue = Queue.Queue(maxsize=max_pending)
+        self.error = None
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+
+            try:
+                if item is None:
+                    return
+
+                if self.error is None:
+                    self.write(*item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def save(self, episode, names, values, params, replay_memory=None, replay_meta=None, statistics=None):
+        self._check()
+        self.queue.put((episode, names, values, params, replay_memory, replay_meta, statistics))
+
+    def write(self, episode, names, values, params, replay_memory, replay_meta, statistics):
+        name = 'checkpoint-%d' % episode
+        temporary_path = os.path.join(self.path, name + '.tmp')
+        checkpoint_path = os.path.join(self.path, name)
+
+        if os.path.exists(temporary_path):
+            shutil.rmtree(temporary_path)
+
+        os.mkdir(temporary_path)
+
+        if replay_memory is not None:
+            replay_memory.write(replay_meta)
+
+        with open(os.path.join(temporary_path, 'variables.npz'), 'wb') as f:
+            np.savez(f, *values)
+
+        if statistics is not None:
+            with open(os.path.join(temporary_path, 'statistics.npz'), 'wb') as f:
+                np.savez(f, **statistics)
+
+        with open(os.path.join(temporary_path, 'params.json'), 'w') as f:
+            json.dump(params, f, indent=2, separators=(',', ': '))
+
+        with open(os.path.join(temporary_path, 'checkpoint.json'), 'w') as f:
+            json.dump({'episode': episode, 'variables': names, 'replay_memory': replay_meta}, f)
+
+        if os.path.exists(checkpoint_path):
+            shutil.rmtree(checkpoint_path)
+
+        os.rename(temporary_path, checkpoint_path)
+
+        for episode in Checkpointer.episodes(self.path)[:-self.keep]:
+            shutil.rmtree(os.path.join(self.path, 'checkpoint-%d' % episode), ignore_errors=True)
+
+    def wait(self):
+        self.queue.join()
+        self._check()
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+        self._check()
+
+    @staticmethod
+    def episodes(path):
+        if not os.path.exists(path):
+            return []
+
+        return sorted([int(name.split('-')[1]) for name in os.listdir(path)
+                       if name.startswith('checkpoint-') and not name.endswith('.tmp')])
+
+    @staticmethod
+    def latest(path):
+        episodes = Checkpointer.episodes(path)
+
+        if len(episodes) == 0:
+            return None
+
+        return os.path.join(path, 'checkpoint-%d' % episodes[-1])
+
+    @staticmethod
+    def load(path):
+        with open(os.path.join(path, 'checkpoint.json')) as f:
+            checkpoint = json.load(f)
+
+        with open(os.path.join(path, 'params.json')) as f:
+            params = json.load(f)
+
+        with np.load(os.path.join(path, 'variables.npz')) as variables:
+            values = [variables['arr_%d' % i] for i in range(len(checkpoint['variables']))]
+
+        return checkpoint, params, dict(zip(checkpoint['variables'], values))
+
+    @staticmethod
+    def load_statistics(path):
+        if not os.path.exists(os.path.join(path, 'statistics.npz')):
+            return None
+
+        with np.load(os.path.join(path, 'statistics.npz')) as statistics:
+            return dict([(key, statistics[key]) for key in statistics.files])
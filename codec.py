@@ -0,0 +1,43 @@
+import numpy as np
+
+from gridworld import CounterMetaClass
+
+
+class Uint8Codec:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.shape = [width, height]
+
+    def encode(self, frames):
+        return np.asarray(frames, dtype=np.uint8)
+
+    def decode(self, data):
+        return data
+
+
+class NibbleCodec:
+    def __init__(self, width, height):
+        assert CounterMetaClass.counter <= 16, 'NibbleCodec stores tile IDs in 4 bits, use the uint8 codec instead'
+
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.shape = [(self.cells + 1) // 2]
+
+    def encode(self, frames):
+        frames = np.asarray(frames, dtype=np.uint8)
+        flat = np.zeros(frames.shape[:-2] + (2 * self.shape[0],), dtype=np.uint8)
+        flat[..., :self.cells] = frames.reshape(frames.shape[:-2] + (self.cells,))
+
+        return flat[..., 0::2] | (flat[..., 1::2] << 4)
+
+    def decode(self, data):
+        flat = np.empty(data.shape[:-1] + (2 * self.shape[0],), dtype=np.uint8)
+        flat[..., 0::2] = data & 15
+        flat[..., 1::2] = data >> 4
+
+        return flat[..., :self.cells].reshape(data.shape[:-1] + (self.width, self.height))
+
+
+CODECS = {'uint8': Uint8Codec, 'nibble': NibbleCodec}
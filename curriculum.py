@@ -0,0 +1,77 @@
+import argparse
+import multiprocessing
+import time
+
+from sweep import WORLDS, run, start_pool
+
+
+def graph(chain, seeds):
+    jobs = {}
+    dependencies = {}
+
+    for i in range(1, seeds + 1):
+        for j, world in enumerate(chain):
+            final_name = 'final_%s_%d' % (world, i)
+
+            jobs[final_name] = (final_name, 'world_%s.json' % world)
+            dependencies[final_name] = None
+
+            if j > 0:
+                curriculum_name = 'curriculum_%s_%d' % (world, i)
+
+                jobs[curriculum_name] = (curriculum_name, 'world_%s.json' % world)
+                dependencies[curriculum_name] = 'final_%s_%d' % (chain[j - 1], i)
+
+    return jobs, dependencies
+
+
+def schedule(pool, jobs, dependencies, poll_interval=1.0):
+    dependents = {}
+
+    for name, dependency in dependencies.iteritems():
+        if dependency is not None:
+            dependents.setdefault(dependency, []).append(name)
+
+    def submit(name, initial_weights=None):
+        model_name, world_path = jobs[name]
+        job = (model_name, world_path, initial_weights, name in dependents)
+
+        return pool.apply_async(run, [job])
+
+    running = dict([(name, submit(name)) for name, dependency in dependencies.iteritems() if dependency is None])
+
+    while len(running) > 0:
+        for name, result in running.items():
+            if not result.ready():
+                continue
+
+            del running[name]
+            _, weights = result.get()
+
+            print 'Finished model %s.' % name
+
+            for dependent in dependents.get(name, []):
+                running[dependent] = submit(dependent, weights)
+
+        time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chain', nargs='+', default=WORLDS)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--cores_per_job', type=int, default=1)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--intra_op_threads', type=int)
+    parser.add_argument('--inter_op_threads', type=int)
+
+    args = parser.parse_args()
+
+    processes = args.processes or max(multiprocessing.cpu_count() // args.cores_per_job, 1)
+    pool = start_pool(processes, args.cores_per_job, args.intra_op_threads, args.inter_op_threads)
+
+    jobs, dependencies = graph(args.chain, args.seeds)
+    schedule(pool, jobs, dependencies)
+
+    pool.close()
+    pool.join()
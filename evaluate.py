@@ -0,0 +1,118 @@
+import argparse
+import glob
+import json
+import os
+import random
+import time
+import numpy as np
+
+from gridworld import *
+from levels import LevelPool
+from inference import NumpyNetwork
+from solver import solve
+from checkpoint import Checkpointer
+
+
+def load_weights(results_path, params):
+    import tensorflow as tf
+    from model import Network
+
+    checkpoint_path = Checkpointer.latest(os.path.join(results_path, 'checkpoints'))
+
+    with tf.Graph().as_default(), tf.Session() as session:
+        network = Network(input_shape=[params['width'], params['height'], params['memory']],
+                          output_shape=[params['actions']])
+
+        if checkpoint_path is not None:
+            _, _, variables = Checkpointer.load(checkpoint_path)
+
+            return [variables[variable.name] for variable in network.variables()]
+
+        tf.train.Saver(network.variables()).restore(session, os.path.join(results_path, 'model.ckpt'))
+
+        return network.get_weights(session)
+
+
+def evaluate(network, params, entities, levels=1000, seed=0, batch_size=None, regret=False):
+    pool = LevelPool(entities, params['width'], params['height'], size=levels, seed=seed)
+    worlds = [pool.world(index=i, memory=params['memory']) for i in range(levels)]
+    active = range(levels)
+    rewards = np.zeros(levels)
+    steps = np.zeros(levels, dtype=np.int64)
+    successes = np.zeros(levels, dtype=np.bool_)
+
+    random.seed(seed)
+
+    start = time.time()
+
+    while len(active) > 0:
+        remaining = []
+
+        for offset in range(0, len(active), batch_size or len(active)):
+            batch = active[offset:offset + (batch_size or len(active))]
+            states = np.concatenate([worlds[i].frames for i in batch])
+            actions = np.argmax(network.output(states), axis=1)
+
+            for i, action in zip(batch, actions):
+                world = worlds[i]
+                world.act(action)
+
+                if world.terminal() or world.t() >= params['episode_length']:
+                    rewards[i] = world.total_reward()
+                    steps[i] = world.t()
+                    successes[i] = world.reached_goal()
+                else:
+                    remaining.append(i)
+
+        active = remaining
+
+    elapsed = time.time() - start
+
+    results = {
+        'levels': levels, 'seed': seed, 'episode_length': params['episode_length'],
+        'mean_reward': float(np.mean(rewards)), 'std_reward': float(np.std(rewards)),
+        'success_rate': float(np.mean(successes)),
+        'mean_steps_to_goal': float(np.mean(steps[successes])) if np.any(successes) else None,
+        'std_steps_to_goal': float(np.std(steps[successes])) if np.any(successes) else None,
+        'frames': int(np.sum(steps)), 'seconds': elapsed, 'frames_per_second': np.sum(steps) / max(elapsed, 1e-9)
+    }
+
+    if regret:
+        optimal = np.array([solve(pool.tiles[i], params['episode_length']).value(*pool.starts[i])
+                            for i in range(levels)])
+
+        results['mean_optimal_reward'] = float(np.mean(optimal))
+        results['mean_regret'] = float(np.mean(optimal - rewards))
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('model_name')
+    parser.add_argument('--world_path')
+    parser.add_argument('--levels', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch_size', type=int)
+    parser.add_argument('--regret', action='store_true')
+    parser.add_argument('--output')
+
+    args = parser.parse_args()
+
+    results_path = os.path.join('models', args.model_name)
+
+    with open(os.path.join(results_path, 'params.json')) as f:
+        params = json.load(f)
+
+    world_path = args.world_path or sorted(glob.glob(os.path.join(results_path, 'world*.json')))[0]
+    network = NumpyNetwork(load_weights(results_path, params))
+
+    results = evaluate(network, params, load_entities(world_path), levels=args.levels, seed=args.seed,
+                       batch_size=args.batch_size, regret=args.regret)
+    results['model_name'] = args.model_name
+    results['world_path'] = world_path
+
+    with open(args.output or os.path.join(results_path, 'evaluation.json'), 'w') as f:
+        json.dump(results, f, indent=2, separators=(',', ': '), sort_keys=True)
+
+    print json.dumps(results, indent=2, separators=(',', ': '), sort_keys=True)
@@ -1,23 +1,35 @@
+import json
+import os
 import random
 import time
 import sys
+import threading
 import numpy as np
 import warnings
+import Queue
 
 from enum import Enum
 
-try:
-    import pygame
-except ImportError:
-    warnings.warn('PyGame not detected, trying to run without it.')
+pygame = None
 
 Direction = Enum('Direction', 'left right up down')
 
 
+def init_pygame():
+    global pygame
+
+    if pygame is None:
+        import pygame as module
+
+        pygame = module
+
+    return pygame
+
+
 class GridWorld:
     PENALTY = 0.01
 
-    def __init__(self, grid=None, width=8, height=8, entities=None):
+    def __init__(self, grid=None, width=8, height=8, entities=None, memory=1):
         if grid:
             self.grid = grid
         else:
@@ -27,30 +39,35 @@ class GridWorld:
         self.height = len(self.grid[0])
 
         empty_indices = []
+        self.positions = {}
 
         for x in range(self.width):
             for y in range(self.height):
                 if self.grid[x][y] == Empty:
                     empty_indices.append((x, y))
 
+                self.positions.setdefault(self.grid[x][y], []).append((x, y))
                 self.grid[x][y] = self.grid[x][y](self, x, y)
 
         x, y = random.choice(empty_indices)
         self.agent = Agent(self, x, y)
-        self.history = [self.current_state()]
+        self.memory = memory
+        self.frames = np.empty([1, self.width, self.height, memory], dtype=np.int8)
+        self.frames[0] = np.expand_dims(self.current_state(), -1)
         self._total_reward = 0
         self._t = 0
 
-    def state(self, memory=1):
-        result = []
-        missing_length = np.max([0, memory - len(self.history)])
+    def state(self, memory=None):
+        if memory is None:
+            memory = self.memory
 
-        for _ in range(missing_length):
-            result.append(self.history[0])
+        assert memory <= self.memory
 
-        result += self.history[-memory:]
+        return self.frames[:, :, :, -memory:].copy()
 
-        return np.reshape(result, [-1, memory, self.width, self.height]).transpose(0, 2, 3, 1)
+    def push_frame(self):
+        self.frames[:, :, :, :-1] = self.frames[:, :, :, 1:]
+        self.frames[0, :, :, -1] = self.current_state()
 
     def current_state(self):
         return [[self.id(x, y) for y in range(self.height)] for x in range(self.width)]
@@ -63,6 +80,9 @@ class GridWorld:
 
         return self.grid[x][y].terminal()
 
+    def reached_goal(self):
+        return isinstance(self.grid[self.agent.x][self.agent.y], Goal)
+
     def total_reward(self):
         return self._total_reward
 
@@ -89,7 +109,7 @@ class GridWorld:
 
         reward = self.grid[self.agent.x][self.agent.y].reward() - GridWorld.PENALTY
 
-        self.history.append(self.current_state())
+        self.push_frame()
 
         self._total_reward += reward
         self._t += 1
@@ -97,7 +117,7 @@ class GridWorld:
         return reward
 
     @staticmethod
-    def generate(entities, width, height):
+    def generate(entities, width, height, rng=random):
         grid = [[None for _ in range(height)] for _ in range(width)]
 
         for x in range(width):
@@ -121,10 +141,10 @@ class GridWorld:
         entities[Empty] = empty_spaces - count
 
         indices = [(x, y) for x in range(1, width - 1) for y in range(1, height - 1)]
-        random.shuffle(indices)
+        rng.shuffle(indices)
         index = 0
 
-        for key, value in entities.iteritems():
+        for key, value in sorted(entities.iteritems(), key=lambda item: item[0].ID):
             for _ in range(value):
                 x, y = indices[index]
                 index += 1
@@ -134,14 +154,179 @@ class GridWorld:
         return grid
 
 
+class CompactGridWorld(GridWorld):
+    def __init__(self, grid=None, width=8, height=8, entities=None, memory=1, tiles=None, start=None):
+        if tiles is not None:
+            self.grid = None
+            self.tiles = np.array(tiles, dtype=np.int8)
+        else:
+            if grid:
+                self.grid = grid
+            else:
+                self.grid = GridWorld.generate(entities, width, height)
+
+            self.tiles = np.array([[entity.ID for entity in column] for column in self.grid], dtype=np.int8)
+
+        self.width, self.height = self.tiles.shape
+        self.coins = self.tiles == Coin.ID
+        self.switches = self.tiles == Switch.ID
+        self.doors = self.tiles == Door.ID
+        self.background = self.tiles.copy()
+        self.positions = {}
+
+        order = np.argsort(self.tiles.ravel(), kind='mergesort')
+        ids, bounds = np.unique(self.tiles.ravel()[order], return_index=True)
+        coordinates = zip((order // self.height).tolist(), (order % self.height).tolist())
+
+        for tile, start_index, end_index in zip(ids, bounds, list(bounds[1:]) + [len(order)]):
+            self.positions[CounterMetaClass.classes[tile]] = coordinates[start_index:end_index]
+
+        if start is None:
+            x, y = random.choice(self.positions[Empty])
+        else:
+            x, y = start
+
+        self.agent = Agent(self, x, y)
+        self._state = self.background.copy()
+        self._state[x, y] = Agent.ID
+        self.memory = memory
+        self.frames = np.empty([1, self.width, self.height, memory], dtype=np.int8)
+        self.frames[0] = np.expand_dims(self._state, -1)
+        self._total_reward = 0
+        self._t = 0
+
+    def current_state(self):
+        return self._state
+
+    def id(self, x, y):
+        return self._state[x, y]
+
+    def entity(self, x, y):
+        if self.agent.x == x and self.agent.y == y:
+            return Agent
+        else:
+            return CounterMetaClass.classes[self.background[x, y]]
+
+    def terminal(self):
+        return CounterMetaClass.classes[self.tiles[self.agent.x, self.agent.y]].TERMINAL
+
+    def reached_goal(self):
+        return self.tiles[self.agent.x, self.agent.y] == Goal.ID
+
+    def color(self, x, y):
+        return self.entity(x, y).COLOR
+
+    def surface(self, x, y, size):
+        return self.entity(x, y)._surface(size)
+
+    def move(self, direction):
+        x, y = self.agent.target(direction)
+        tile = self.background[x, y]
+
+        if tile == Wall.ID or tile == Door.ID:
+            x, y = self.agent.x, self.agent.y
+        elif tile == Coin.ID:
+            self.coins[x, y] = False
+            self.background[x, y] = Empty.ID
+        elif tile == Switch.ID:
+            for px, py in self.positions.get(Switch, []) + self.positions.get(Door, []):
+                self.switches[px, py] = False
+                self.doors[px, py] = False
+                self.background[px, py] = Empty.ID
+                self._state[px, py] = Empty.ID
+        elif tile == Portal.ID:
+            portals = [position for position in self.positions[Portal] if position != (x, y)]
+
+            if len(portals) > 0:
+                x, y = random.choice(portals)
+
+        self._state[self.agent.x, self.agent.y] = self.background[self.agent.x, self.agent.y]
+        self.agent.x, self.agent.y = x, y
+        self._state[x, y] = Agent.ID
+
+        reward = CounterMetaClass.classes[self.background[x, y]].REWARD - GridWorld.PENALTY
+
+        self.push_frame()
+
+        self._total_reward += reward
+        self._t += 1
+
+        return reward
+
+
+class VectorGridWorld:
+    def __init__(self, size, entities, width=8, height=8, episode_length=None, memory=1, world_class=GridWorld,
+                 auto_reset=True, levels=None):
+        self.size = size
+        self.entities = entities
+        self.width = width
+        self.height = height
+        self.episode_length = episode_length
+        self.memory = memory
+        self.world_class = world_class
+        self.auto_reset = auto_reset
+        self.levels = levels
+        self.worlds = [self.generate() for _ in range(size)]
+        self.finished = []
+
+    @staticmethod
+    def from_params(params, entities, **kwargs):
+        world_class = CompactGridWorld if params.get('compact', False) else GridWorld
+
+        return VectorGridWorld(params.get('environments', 1), entities, width=params['width'], height=params['height'],
+                               episode_length=params['episode_length'], memory=params['memory'],
+                               world_class=world_class, **kwargs)
+
+    def generate(self):
+        if self.levels is not None:
+            return self.levels.world(memory=self.memory)
+
+        return self.world_class(entities=self.entities, width=self.width, height=self.height, memory=self.memory)
+
+    def state(self, memory=None):
+        if memory is None:
+            memory = self.memory
+
+        assert memory <= self.memory
+
+        return np.concatenate([world.frames[:, :, :, -memory:] for world in self.worlds])
+
+    def terminal(self, world):
+        return world.terminal() or (self.episode_length is not None and world.t() >= self.episode_length)
+
+    def act(self, actions):
+        rewards = np.zeros(self.size)
+        terminals = np.zeros(self.size, dtype=np.bool_)
+
+        for i, world in enumerate(self.worlds):
+            rewards[i] = world.act(actions[i])
+            terminals[i] = self.terminal(world)
+
+        states = self.state()
+        self.finished = [(i, self.worlds[i].total_reward(), self.worlds[i].t()) for i in np.nonzero(terminals)[0]]
+
+        if self.auto_reset:
+            self.reset()
+
+        return rewards, terminals, states
+
+    def reset(self):
+        for i, _, _ in self.finished:
+            self.worlds[i] = self.generate()
+
+
 class CounterMetaClass(type):
     counter = 0
+    classes = []
 
     def __new__(mcs, name, bases, attributes):
         attributes['ID'] = CounterMetaClass.counter
         CounterMetaClass.counter += 1
 
-        return type.__new__(mcs, name, bases, attributes)
+        cls = type.__new__(mcs, name, bases, attributes)
+        CounterMetaClass.classes.append(cls)
+
+        return cls
 
 
 class Entity:
@@ -149,7 +334,7 @@ class Entity:
 
     COLOR = '#000000'
     IMG = None
-    SURFACE = None
+    SURFACES = {}
 
     def __init__(self, grid_world, x, y):
         self.grid_world = grid_world
@@ -168,10 +353,17 @@ class Entity:
     @classmethod
     def _surface(cls, size):
         if cls.IMG:
-            if not cls.SURFACE:
-                cls.SURFACE = pygame.transform.scale(pygame.image.load(cls.IMG), (size, size))
+            if (cls, size) not in Entity.SURFACES:
+                init_pygame()
+
+                surface = pygame.transform.scale(pygame.image.load(cls.IMG), (size, size))
+
+                if pygame.display.get_surface() is not None:
+                    surface = surface.convert_alpha()
 
-            return cls.SURFACE
+                Entity.SURFACES[(cls, size)] = surface
+
+            return Entity.SURFACES[(cls, size)]
         else:
             return None
 
@@ -180,7 +372,7 @@ class Agent(Entity):
     COLOR = '#B873FF'
     IMG = 'img/agent.png'
 
-    def move(self, direction):
+    def target(self, direction):
         x, y = self.x, self.y
 
         if direction == Direction.up and y > 0:
@@ -192,6 +384,11 @@ class Agent(Entity):
         if direction == Direction.right and x < self.grid_world.width - 1:
             x += 1
 
+        return x, y
+
+    def move(self, direction):
+        x, y = self.target(direction)
+
         return self.grid_world.grid[x][y].interact(self)
 
 
@@ -279,12 +476,7 @@ class Portal(Block):
     IMG = 'img/portal.png'
 
     def interact(self, agent):
-        portals = []
-
-        for x in range(self.grid_world.width):
-            for y in range(self.grid_world.height):
-                if isinstance(self.grid_world.grid[x][y], Portal) and (x, y) != (self.x, self.y):
-                    portals.append((x, y))
+        portals = [position for position in self.grid_world.positions[Portal] if position != (self.x, self.y)]
 
         if len(portals) > 0:
             x, y = random.choice(portals)
@@ -315,13 +507,11 @@ class Switch(Block):
 
     def interact(self, agent):
         if self.active:
-            for x in range(self.grid_world.width):
-                for y in range(self.grid_world.height):
-                    if isinstance(self.grid_world.grid[x][y], Switch):
-                        self.grid_world.grid[x][y].active = False
+            for x, y in self.grid_world.positions[Switch]:
+                self.grid_world.grid[x][y].active = False
 
-                    if isinstance(self.grid_world.grid[x][y], Door):
-                        self.grid_world.grid[x][y].open = True
+            for x, y in self.grid_world.positions.get(Door, []):
+                self.grid_world.grid[x][y].open = True
 
         agent.x = self.x
         agent.y = self.y
@@ -351,65 +541,192 @@ class Door(Block):
             agent.y = self.y
 
 
+def parse_entities(world):
+    classes = dict([(cls.__name__, cls) for cls in CounterMetaClass.classes])
+
+    return dict([(classes[name], count) for name, count in world.iteritems()])
+
+
+def load_entities(world_path):
+    with open(world_path) as f:
+        return parse_entities(json.load(f))
+
+
+class Recorder(threading.Thread):
+    def __init__(self, path, fps=10, extension='gif', size=256):
+        threading.Thread.__init__(self)
+
+        self.daemon = True
+        self.path = path
+        self.fps = fps
+        self.extension = extension
+        self.queue = Queue.Queue(maxsize=size)
+        self.dropped = 0
+
+        try:
+            import imageio
+
+            self.imageio = imageio
+        except ImportError:
+            warnings.warn('imageio not detected, recording episodes as PNG frames.')
+
+            self.imageio = None
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+    def record(self, episode, frame):
+        try:
+            self.queue.put_nowait((episode, frame))
+        except Queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        writer = None
+        current_episode = None
+        t = 0
+
+        while True:
+            item = self.queue.get()
+
+            if item is None or item[0] != current_episode:
+                if writer is not None:
+                    writer.close()
+                    writer = None
+
+                if item is None:
+                    return
+
+                current_episode = item[0]
+                t = 0
+
+                if self.imageio is not None:
+                    writer = self.imageio.get_writer(os.path.join(self.path, 'episode_%d.%s' %
+                                                                  (current_episode, self.extension)), fps=self.fps)
+                elif not os.path.exists(os.path.join(self.path, 'episode_%d' % current_episode)):
+                    os.makedirs(os.path.join(self.path, 'episode_%d' % current_episode))
+
+            episode, frame = item
+
+            if writer is not None:
+                writer.append_data(frame.transpose(1, 0, 2))
+            else:
+                pygame.image.save(pygame.surfarray.make_surface(frame),
+                                  os.path.join(self.path, 'episode_%d' % episode, 'frame_%d.png' % t))
+
+            t += 1
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+
+
 class Display:
-    def __init__(self, width=8, height=8, field_size=32):
-        pygame.init()
-        pygame.display.set_caption('GridWorld')
+    def __init__(self, width=8, height=8, field_size=32, headless=False, record_path=None, fps=10):
+        init_pygame()
 
         self.width = width
         self.height = height
         self.field_size = field_size
-        self.screen = pygame.display.set_mode((self.width * field_size, self.height * field_size))
+        self.headless = headless
+
+        if headless:
+            pygame.font.init()
+
+            self.screen = pygame.Surface((self.width * field_size, self.height * field_size))
+        else:
+            pygame.init()
+            pygame.display.set_caption('GridWorld')
+
+            self.screen = pygame.display.set_mode((self.width * field_size, self.height * field_size))
+
+        self.font = pygame.font.Font(None, 18)
+        self.colors = {}
+        self.cells = None
+        self.labels = []
+        self.world = None
+        self.episode = -1
+
+        if record_path is not None:
+            self.recorder = Recorder(record_path, fps=fps)
+            self.recorder.start()
+        else:
+            self.recorder = None
 
     def xy2rect(self, x, y, padding=1):
         return pygame.Rect(x * self.field_size + padding, y * self.field_size + padding,
                            self.field_size - 2 * padding, self.field_size - 2 * padding)
 
-    def draw(self, grid_world, rewards=None):
-        self.screen.fill((255, 255, 255))
+    def color(self, color):
+        if color not in self.colors:
+            self.colors[color] = pygame.Color(color)
 
-        for x in range(self.width):
-            for y in range(self.height):
-                if grid_world.grid[x][y] is not Empty:
-                    self.screen.blit(Empty._surface(self.field_size), (x * self.field_size, y * self.field_size))
+        return self.colors[color]
 
-                surface = grid_world.surface(x, y, self.field_size)
+    def draw_cell(self, x, y, tile):
+        entity = CounterMetaClass.classes[tile]
+        position = (x * self.field_size, y * self.field_size)
+        surface = entity._surface(self.field_size)
 
-                if surface:
-                    self.screen.blit(surface, (x * self.field_size, y * self.field_size))
-                else:
-                    pygame.draw.rect(self.screen, pygame.Color(grid_world.color(x, y)), self.xy2rect(x, y))
+        self.screen.blit(Empty._surface(self.field_size), position)
 
-        if rewards is not None:
-            for action in range(len(rewards)):
-                x, y = (grid_world.agent.x, grid_world.agent.y)
+        if surface:
+            self.screen.blit(surface, position)
+        else:
+            pygame.draw.rect(self.screen, self.color(entity.COLOR), self.xy2rect(x, y))
 
-                direction = Direction(action + 1)
+        return pygame.Rect(position, (self.field_size, self.field_size))
 
-                if direction == Direction.up:
-                    y -= 1
-                if direction == Direction.down:
-                    y += 1
-                if direction == Direction.left:
-                    x -= 1
-                if direction == Direction.right:
-                    x += 1
+    def draw(self, grid_world, rewards=None, episode=None):
+        cells = grid_world.frames[0, :, :, -1]
 
-                rect = self.xy2rect(x, y)
-                font = pygame.font.Font(None, 18)
+        if grid_world is not self.world:
+            self.world = grid_world
+            self.episode = self.episode + 1 if episode is None else episode
+
+        if self.cells is None:
+            self.screen.fill((255, 255, 255))
+
+            changed = [(x, y) for x in range(self.width) for y in range(self.height)]
+        else:
+            changed = set([(int(x), int(y)) for x, y in np.argwhere(cells != self.cells)] + self.labels)
+
+        self.cells = cells.copy()
+        rects = [self.draw_cell(x, y, self.cells[x, y]) for x, y in changed]
+        self.labels = []
+
+        if rewards is not None:
+            best_action = np.argmax(rewards)
 
-                if action == np.argmax(rewards):
-                    color = '#8C151B'
-                else:
-                    color = '#DADAD5'
+            for action in range(len(rewards)):
+                x, y = grid_world.agent.target(Direction(action + 1))
+
+                if (x, y) == (grid_world.agent.x, grid_world.agent.y):
+                    continue
 
-                text = font.render('%.2f' % rewards[action], 1, pygame.Color(color))
+                rect = self.xy2rect(x, y)
+                color = '#8C151B' if action == best_action else '#DADAD5'
+                text = self.font.render('%.2f' % rewards[action], 1, self.color(color))
                 text_position = text.get_rect()
                 text_position.center = rect.center
 
                 self.screen.blit(text, text_position)
+                self.labels.append((x, y))
+
+                if (x, y) not in changed:
+                    rects.append(pygame.Rect(x * self.field_size, y * self.field_size,
+                                             self.field_size, self.field_size))
+
+        if self.recorder is not None:
+            self.recorder.record(self.episode, pygame.surfarray.array3d(self.screen))
+
+        if not self.headless:
+            pygame.display.update(rects)
 
-        pygame.display.update()
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
 
 
 if __name__ == '__main__':
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+VARIABLES = ['W_conv1', 'b_conv1', 'W_conv2', 'b_conv2', 'W_flat', 'b_flat', 'W_output', 'b_output']
+
+
+class NumpyNetwork:
+    def __init__(self, weights=None):
+        if weights is not None:
+            self.set_weights(weights)
+
+    def set_weights(self, weights):
+        for name, value in zip(VARIABLES, weights):
+            setattr(self, name, np.asarray(value, dtype=np.float32))
+
+    def sync(self, network, session):
+        self.set_weights(network.get_weights(session))
+
+    def output(self, states):
+        states = np.asarray(states, dtype=np.float32)
+
+        h_conv1 = np.maximum(self._conv(states, self.W_conv1) + self.b_conv1, 0)
+        h_conv2 = np.maximum(self._conv(h_conv1, self.W_conv2) + self.b_conv2, 0)
+        flat = h_conv2.reshape([len(states), -1])
+        h_flat = np.maximum(np.dot(flat, self.W_flat) + self.b_flat, 0)
+
+        return np.dot(h_flat, self.W_output) + self.b_output
+
+    @staticmethod
+    def _conv(input, W):
+        batch_size, height, width, channels = input.shape
+        kernel_height, kernel_width = W.shape[:2]
+        top, left = (kernel_height - 1) // 2, (kernel_width - 1) // 2
+
+        padded = np.zeros([batch_size, height + kernel_height - 1, width + kernel_width - 1, channels],
+                          dtype=np.float32)
+        padded[:, top:(top + height), left:(left + width), :] = input
+
+        patches = np.concatenate([padded[:, i:(i + height), j:(j + width), :]
+                                  for i in range(kernel_height) for j in range(kernel_width)], axis=3)
+
+        return np.dot(patches.reshape([-1, kernel_height * kernel_width * channels]),
+                      W.reshape([-1, W.shape[3]])).reshape([batch_size, height, width, W.shape[3]])
@@ -0,0 +1,110 @@
+import threading
+import Queue
+
+
+class Prefetcher(threading.Thread):
+    def __init__(self, sample, size=4):
+        threading.Thread.__init__(self)
+
+        self.daemon = True
+        self.sample = sample
+        self.queue = Queue.Queue(maxsize=size)
+        self.stopped = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                batch = self.sample()
+
+                while not self.stopped.is_set():
+                    try:
+                        self.queue.put(batch, timeout=1.0)
+
+                        break
+                    except Queue.Full:
+                        continue
+        except Exception as e:
+            self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def get(self):
+        while True:
+            self._check()
+
+            try:
+                return self.queue.get(timeout=1.0)
+            except Queue.Empty:
+                continue
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Learner(threading.Thread):
+    def __init__(self, step, batches, max_pending=8):
+        threading.Thread.__init__(self)
+
+        self.daemon = True
+        self.step = step
+        self.batches = batches
+        self.max_pending = max_pending
+        self.pending = 0
+        self.error = None
+        self.stopped = False
+        self.condition = threading.Condition()
+
+    def run(self):
+        try:
+            while True:
+                with self.condition:
+                    while self.pending == 0 and not self.stopped:
+                        self.condition.wait()
+
+                    if self.pending == 0:
+                        return
+
+                self.step(self.batches())
+
+                with self.condition:
+                    self.pending -= 1
+                    self.condition.notify_all()
+        except Exception as e:
+            with self.condition:
+                self.error = e
+                self.condition.notify_all()
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def schedule(self, steps):
+        with self.condition:
+            self._check()
+
+            self.pending += steps
+            self.condition.notify_all()
+
+            while self.pending > self.max_pending and self.error is None:
+                self.condition.wait(1.0)
+
+            self._check()
+
+    def wait(self):
+        with self.condition:
+            while self.pending > 0 and self.error is None:
+                self.condition.wait(1.0)
+
+            self._check()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        self.join()
+        self._check()
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import random
+import numpy as np
+
+from gridworld import GridWorld, CompactGridWorld, Empty
+
+
+class LevelPool:
+    def __init__(self, entities, width, height, size=10000, seed=0, path='levels'):
+        self.entities = dict([(key, value) for key, value in entities.iteritems() if key is not Empty])
+        self.width = width
+        self.height = height
+        self.size = size
+        self.seed = seed
+        self.path = os.path.join(path, '%s.npz' % self.key())
+
+        if os.path.exists(self.path):
+            self.load()
+        else:
+            self.generate()
+            self.save(path)
+
+    def key(self):
+        config = [sorted([(key.__name__, value) for key, value in self.entities.iteritems()]),
+                  self.width, self.height, self.size, self.seed]
+
+        return hashlib.md5(json.dumps(config)).hexdigest()
+
+    def generate(self):
+        rng = random.Random(self.seed)
+
+        self.tiles = np.empty([self.size, self.width, self.height], dtype=np.int8)
+        self.starts = np.empty([self.size, 2], dtype=np.int16)
+
+        for i in range(self.size):
+            grid = GridWorld.generate(dict(self.entities), self.width, self.height, rng=rng)
+
+            self.tiles[i] = [[entity.ID for entity in column] for column in grid]
+            self.starts[i] = rng.choice(np.argwhere(self.tiles[i] == Empty.ID))
+
+    def save(self, path):
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        with open(self.path + '.tmp', 'wb') as f:
+            np.savez(f, tiles=self.tiles, starts=self.starts)
+
+        os.rename(self.path + '.tmp', self.path)
+
+    def load(self):
+        with np.load(self.path) as levels:
+            self.tiles = levels['tiles']
+            self.starts = levels['starts']
+
+    def world(self, index=None, memory=1):
+        if index is None:
+            index = random.randrange(self.size)
+
+        return CompactGridWorld(tiles=self.tiles[index], start=tuple(self.starts[index]), memory=memory)
@@ -0,0 +1,82 @@
+import atexit
+import os
+import time
+import numpy as np
+
+
+FRAME_DTYPE = np.dtype([('frame', '<i8'), ('reward', '<f4')])
+
+
+class Logger:
+    def __init__(self, path, header, line_format, flush_size=10000, flush_interval=60.0):
+        self.path = path
+        self.header = header
+        self.line_format = line_format
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.records = []
+        self.bytes_written = 0
+        self.last_flush = time.time()
+        self.file = self._open()
+
+        atexit.register(self.close)
+
+    def _open(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        f = open(self.path, 'a')
+
+        if is_new and self.header is not None:
+            f.write(self.header + '\n')
+
+        return f
+
+    def log(self, *values):
+        self.records.append(values)
+
+        if len(self.records) >= self.flush_size or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def _write(self, records):
+        data = ''.join([(self.line_format % record) + '\n' for record in records])
+
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def flush(self):
+        if self.file is None:
+            return
+
+        if len(self.records) > 0:
+            self._write(self.records)
+            self.records = []
+
+        self.file.flush()
+        self.last_flush = time.time()
+
+    def close(self):
+        if self.file is None:
+            return
+
+        self.flush()
+        self.file.close()
+        self.file = None
+
+
+class BinaryLogger(Logger):
+    def __init__(self, path, dtype=FRAME_DTYPE, flush_size=10000, flush_interval=60.0):
+        self.dtype = dtype
+
+        Logger.__init__(self, path, None, None, flush_size=flush_size, flush_interval=flush_interval)
+
+    def _open(self):
+        return open(self.path, 'ab')
+
+    def _write(self, records):
+        data = np.array(records, dtype=self.dtype)
+
+        data.tofile(self.file)
+        self.bytes_written += data.nbytes
+
+
+def read_binary_log(path, dtype=FRAME_DTYPE):
+    return np.fromfile(path, dtype=dtype)
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+
+from collections import defaultdict
+
+
+class Timer:
+    def __init__(self, times, phase):
+        self.times = times
+        self.phase = phase
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+
+        return self
+
+    def __exit__(self, *args):
+        self.times[self.phase] += time.time() - self.start
+
+
+class Metrics:
+    def __init__(self, path=None):
+        self.path = path
+        self.times = defaultdict(float)
+        self.background_times = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.timers = {}
+        self.thread = threading.current_thread()
+        self.start = time.time()
+        self.last_report = self.start
+        self.last_counters = {}
+
+    def time(self, phase):
+        thread = threading.current_thread()
+        key = (thread.ident, phase)
+
+        if key not in self.timers:
+            self.timers[key] = Timer(self.times if thread is self.thread else self.background_times, phase)
+
+        return self.timers[key]
+
+    def count(self, counter, value=1):
+        self.counters[counter] += value
+
+    def set(self, counter, value):
+        self.counters[counter] = value
+
+    def report(self):
+        now = time.time()
+        interval = max(now - self.last_report, 1e-9)
+        counters = dict(self.counters)
+        rates = dict([(counter, (value - self.last_counters.get(counter, 0)) / interval)
+                      for counter, value in counters.iteritems()])
+        record = {
+            'time': now, 'elapsed': now - self.start, 'times': dict(self.times),
+            'background_times': dict(self.background_times), 'counters': counters, 'rates': rates
+        }
+
+        self.last_report = now
+        self.last_counters = counters
+
+        if self.path is not None:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+        return record
+
+    def summary(self, record):
+        total = max(sum(record['times'].values()), 1e-9)
+        elapsed = max(record['elapsed'], 1e-9)
+        phases = sorted(record['times'].iteritems(), key=lambda item: -item[1])
+        background = sorted(record.get('background_times', {}).iteritems(), key=lambda item: -item[1])
+        summary = '%.0f frames/s; %s' % (record['rates'].get('frames', 0.0),
+                                         ', '.join(['%s %.0f%%' % (phase, 100 * t / total) for phase, t in phases]))
+
+        if len(background) > 0:
+            summary += '; background %s' % ', '.join(['%s %.0f%% of wall time' % (phase, 100 * t / elapsed)
+                                                      for phase, t in background])
+
+        return summary
@@ -1,6 +1,8 @@
 import tensorflow as tf
 import numpy as np
 
+from inference import VARIABLES, NumpyNetwork
+
 
 class Network:
     def __init__(self, input_shape, output_shape):
@@ -32,6 +34,18 @@ class Network:
 
         self.output = tf.matmul(self.h_flat, self.W_output) + self.b_output
 
+        self._weights = [tf.placeholder(tf.float32, variable.get_shape()) for variable in self.variables()]
+        self._assign = [variable.assign(weight) for variable, weight in zip(self.variables(), self._weights)]
+
+    def variables(self):
+        return [getattr(self, name) for name in VARIABLES]
+
+    def get_weights(self, session):
+        return session.run(self.variables())
+
+    def set_weights(self, session, weights):
+        session.run(self._assign, feed_dict=dict(zip(self._weights, weights)))
+
     @staticmethod
     def _weight(shape, stddev=0.01):
         return tf.Variable(tf.truncated_normal(shape, stddev=stddev))
@@ -47,3 +61,23 @@ class Network:
     @staticmethod
     def _pool(input):
         return tf.nn.max_pool(input, ksize=[1, 2, 2, 1], strides=[1, 2, 2, 1], padding='SAME')
+
+
+if __name__ == '__main__':
+    network = Network(input_shape=[10, 10, 2], output_shape=[4])
+    numpy_network = NumpyNetwork()
+
+    with tf.Session() as session:
+        session.run(tf.initialize_all_variables())
+        network.set_weights(session, [np.random.normal(0, 0.1, variable.get_shape().as_list())
+                                      for variable in network.variables()])
+        numpy_network.sync(network, session)
+
+        for batch_size in [1, 32]:
+            states = np.random.randint(0, 12, size=[batch_size, 10, 10, 2]).astype(np.float32)
+            expected = session.run(network.output, feed_dict={network.state: states})
+            actual = numpy_network.output(states)
+
+            print 'Batch size %d: maximum difference of %.2e' % (batch_size, np.max(np.abs(expected - actual)))
+
+            assert np.allclose(expected, actual, rtol=1e-4, atol=1e-4)
@@ -1,44 +1,85 @@
 import numpy as np
 import seaborn as sns
 import pandas as pd
-import sys
+import argparse
 import os
 
+from logger import FRAME_DTYPE
 
-assert len(sys.argv) > 1
 
-model_name = sys.argv[1]
+def read_chunks(path, chunk_size=None):
+    if path.endswith('.bin'):
+        log = np.memmap(path, dtype=FRAME_DTYPE, mode='r')
+        step = chunk_size or len(log)
 
-if len(sys.argv) > 2:
-    batch = int(sys.argv[2])
-else:
-    batch = 50000
+        for index in range(0, len(log), max(step, 1)):
+            chunk = log[index:(index + step)]
 
-df = pd.read_csv(os.path.join('models', model_name, 'log.csv'))
+            yield np.asarray(chunk['frame']), np.asarray(chunk['reward'])
+    elif chunk_size:
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            yield chunk['frame'].values, chunk['reward'].values
+    else:
+        df = pd.read_csv(path)
 
-assert len(df['reward']) > batch
+        yield df['frame'].values, df['reward'].values
 
-rewards = [df['reward'].iloc[0]]
-index = 1
 
-while index < len(df['reward']):
-    k = 1
+def read_rewards(path, chunk_size=None):
+    rewards = np.zeros(0, dtype=np.float32)
+    last_frame = -1
 
-    while df['frame'].iloc[index] <= df['frame'].iloc[index - k]:
-        rewards.pop()
-        k += 1
+    for frames, values in read_chunks(path, chunk_size):
+        if len(frames) == 0:
+            continue
 
-    rewards.append(df['reward'].iloc[index])
-    index += 1
+        _, last_indices = np.unique(frames[::-1], return_index=True)
+        last_indices = len(frames) - 1 - last_indices
+        max_frame = frames[last_indices].max()
 
-mean_rewards = []
-mean_frames = []
-index = 0
+        if max_frame >= len(rewards):
+            resized = np.zeros(max(max_frame + 1, 2 * len(rewards)), dtype=np.float32)
+            resized[:len(rewards)] = rewards
+            rewards = resized
 
-while index + batch <= len(rewards):
-    mean_rewards.append(np.mean(rewards[index:(index + batch)]))
-    mean_frames.append(index + batch / 2)
-    index += batch
+        rewards[frames[last_indices]] = values[last_indices]
+        last_frame = frames[-1]
 
-sns.tsplot(data=mean_rewards, time=mean_frames)
-sns.plt.show()
+    return rewards[:(last_frame + 1)]
+
+
+def batch_means(rewards, batch):
+    count = len(rewards) // batch
+    mean_rewards = rewards[:(count * batch)].reshape(count, batch).mean(axis=1)
+    mean_frames = np.arange(count) * batch + batch // 2
+
+    return mean_rewards, mean_frames
+
+
+def log_path(model_name):
+    for name in ['frames.log', 'frames.bin', 'log.csv']:
+        path = os.path.join('models', model_name, name)
+
+        if os.path.exists(path):
+            return path
+
+    raise IOError('No frame log found for model %s.' % model_name)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('model_name')
+    parser.add_argument('batch', nargs='?', type=int, default=50000)
+    parser.add_argument('--path')
+    parser.add_argument('--chunk_size', type=int)
+
+    args = parser.parse_args()
+
+    rewards = read_rewards(args.path or log_path(args.model_name), args.chunk_size)
+
+    assert len(rewards) > args.batch
+
+    mean_rewards, mean_frames = batch_means(rewards, args.batch)
+
+    sns.tsplot(data=mean_rewards, time=mean_frames)
+    sns.plt.show()
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import numpy as np
+
+from codec import CODECS
+
+
+class ReplayMemory:
+    def __init__(self, size, width, height, memory=1, streams=1, path=None, mode='w+', codec='uint8'):
+        self.size = size
+        self.width = width
+        self.height = height
+        self.memory = memory
+        self.streams = streams
+        self.capacity = int(np.ceil(size / float(streams)))
+        self.path = path
+        self.codec_name = codec
+        self.codec = CODECS[codec](width, height)
+
+        if path is not None and not os.path.exists(path):
+            os.mkdir(path)
+
+        self.frames = self._array('frames', [streams, self.capacity] + self.codec.shape, np.uint8, mode)
+        self.actions = self._array('actions', [streams, self.capacity], np.int8, mode)
+        self.rewards = self._array('rewards', [streams, self.capacity], np.float32, mode)
+        self.terminals = self._array('terminals', [streams, self.capacity], np.bool_, mode)
+        self.writes = self._array('writes', [streams, self.capacity], np.int64,
+                                  'w+' if mode == 'r+' and not os.path.exists(os.path.join(path, 'writes.npy'))
+                                  else mode)
+        self.count = 0
+        self.heads = np.zeros(streams, dtype=np.int64)
+        self.lengths = np.zeros(streams, dtype=np.int64)
+        self.clipped = np.zeros(streams, dtype=np.bool_)
+        self.lock = threading.Lock()
+
+    def _array(self, name, shape, dtype, mode):
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+        else:
+            return np.lib.format.open_memmap(os.path.join(self.path, '%s.npy' % name), mode=mode,
+                                             dtype=dtype, shape=tuple(shape))
+
+    def __len__(self):
+        return int(np.sum(self.lengths))
+
+    def append(self, frame, action, reward, terminal, stream=0):
+        with self.lock:
+            head = self.heads[stream]
+
+            self.frames[stream, head] = self.codec.encode(frame)
+            self.actions[stream, head] = action
+            self.rewards[stream, head] = reward
+            self.terminals[stream, head] = terminal
+            self.count += 1
+            self.writes[stream, head] = self.count
+
+            self.heads[stream] = (head + 1) % self.capacity
+            self.clipped[stream] |= self.lengths[stream] == self.capacity
+            self.lengths[stream] = min(self.lengths[stream] + 1, self.capacity)
+
+    def sample(self, batch_size):
+        with self.lock:
+            return self._sample(batch_size)
+
+    def _sample(self, batch_size):
+        skips, available = self._available()
+
+        assert np.sum(available) >= batch_size
+
+        streams = np.random.choice(self.streams, size=batch_size, p=available / float(np.sum(available)))
+        offsets = skips[streams] + (np.random.random(batch_size) * available[streams]).astype(np.int64)
+        indices = (self.heads[streams] - self.lengths[streams] + offsets) % self.capacity
+
+        return self.stack(streams, offsets), self.actions[streams, indices], self.rewards[streams, indices], \
+            self.stack(streams, offsets + 1), self.terminals[streams, indices]
+
+    def _available(self):
+        skips = np.where(self.clipped, self.memory - 1, 0)
+
+        return skips, np.maximum(self.lengths - 1 - skips, 0)
+
+    def sampleable(self):
+        with self.lock:
+            return int(np.sum(self._available()[1]))
+
+    def stack(self, streams, offsets):
+        starts = self.heads[streams] - self.lengths[streams]
+        positions = offsets[:, np.newaxis] + np.arange(1 - self.memory, 1)[np.newaxis, :]
+        boundary = np.zeros(len(streams), dtype=np.bool_)
+
+        for j in range(self.memory - 2, -1, -1):
+            boundary |= positions[:, j] < 0
+            boundary |= self.terminals[streams, (starts + np.maximum(positions[:, j], 0)) % self.capacity]
+            positions[boundary, j] = positions[boundary, j + 1]
+
+        indices = (starts[:, np.newaxis] + positions) % self.capacity
+
+        return self.codec.decode(self.frames[streams[:, np.newaxis], indices]).transpose(0, 2, 3, 1)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'size': self.size, 'width': self.width, 'height': self.height, 'memory': self.memory,
+                'streams': self.streams, 'codec': self.codec_name, 'heads': self.heads.tolist(),
+                'lengths': self.lengths.tolist(), 'clipped': self.clipped.tolist(), 'count': self.count
+            }
+
+    def write(self, meta):
+        assert self.path is not None
+
+        for array in [self.frames, self.actions, self.rewards, self.terminals, self.writes]:
+            array.flush()
+
+        meta_path = os.path.join(self.path, 'meta.json')
+
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+
+        os.rename(meta_path + '.tmp', meta_path)
+
+    def save(self):
+        self.write(self.snapshot())
+
+    @staticmethod
+    def convert(transitions, size, width, height, memory=1, streams=1, path=None, codec='uint8'):
+        replay_memory = ReplayMemory(size, width, height, memory, streams=streams, path=path, codec=codec)
+        transitions = list(transitions)[-replay_memory.capacity:]
+        terminals = [i for i, transition in enumerate(transitions) if transition[4]]
+        replay_memory.clipped[0] = True
+
+        for state, action, reward, next_state, terminal in transitions[:terminals[-1] + 1 if terminals else 0]:
+            replay_memory.append(state[0, :, :, -1], action, reward, terminal)
+
+        return replay_memory
+
+    @staticmethod
+    def load(path, meta=None):
+        if meta is None:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+
+        replay_memory = ReplayMemory(meta['size'], meta['width'], meta['height'], meta['memory'],
+                                     streams=meta['streams'], path=path, mode='r+',
+                                     codec=meta.get('codec', 'uint8'))
+        replay_memory.heads[:] = meta['heads']
+        replay_memory.lengths[:] = meta['lengths']
+        replay_memory.clipped[:] = meta.get('clipped', replay_memory.lengths == replay_memory.capacity)
+
+        if 'count' in meta:
+            overwritten = np.sum(replay_memory.writes > meta['count'], axis=1)
+
+            replay_memory.clipped |= overwritten > 0
+            replay_memory.lengths[:] = np.minimum(replay_memory.lengths, replay_memory.capacity - overwritten)
+            replay_memory.count = meta['count']
+
+        return replay_memory
@@ -0,0 +1,139 @@
+import argparse
+import json
+import random
+import numpy as np
+
+from gridworld import *
+from levels import LevelPool
+
+
+MOVES = {Direction.left: (-1, 0), Direction.right: (1, 0), Direction.up: (0, -1), Direction.down: (0, 1)}
+CACHE = {}
+
+
+class Solver:
+    def __init__(self, tiles, episode_length, discount=1.0, actions=4):
+        self.tiles = np.array(tiles, dtype=np.int8)
+        self.width, self.height = self.tiles.shape
+        self.episode_length = episode_length
+        self.discount = discount
+        self.actions = actions
+        self.switches = 2 if np.any(self.tiles == Switch.ID) else 1
+        self.size = self.switches * self.width * self.height
+
+        self.transitions()
+        self.iterate()
+
+    def index(self, x, y, switched=False):
+        return (int(switched) * self.width + x) * self.height + y
+
+    def transitions(self):
+        rewards = np.array([getattr(cls, 'REWARD', 0) for cls in CounterMetaClass.classes], dtype=np.float64)
+        terminals = np.array([getattr(cls, 'TERMINAL', False) for cls in CounterMetaClass.classes])
+        rewards[Coin.ID] = Empty.REWARD
+
+        portals = [tuple(position) for position in np.argwhere(self.tiles == Portal.ID)]
+        branches = max(len(portals) - 1, 1)
+        switched, xs, ys = [axis.ravel() for axis in np.indices([self.switches, self.width, self.height])]
+
+        self.next_states = np.empty([self.actions, self.size, branches], dtype=np.int64)
+        self.probabilities = np.zeros([self.actions, self.size, branches])
+        self.rewards = np.empty([self.actions, self.size, branches])
+        self.terminals = np.empty([self.actions, self.size, branches], dtype=np.bool_)
+
+        for action in range(self.actions):
+            dx, dy = MOVES[Direction(action + 1)]
+            tx = np.clip(xs + dx, 0, self.width - 1)
+            ty = np.clip(ys + dy, 0, self.height - 1)
+            tiles = self.tiles[tx, ty]
+            blocked = (tiles == Wall.ID) | ((tiles == Door.ID) & (switched == 0))
+            tx = np.where(blocked, xs, tx)
+            ty = np.where(blocked, ys, ty)
+            next_switched = np.where(tiles == Switch.ID, 1, switched)
+            teleport = (tiles == Portal.ID) & ~blocked & (len(portals) > 1)
+
+            destinations_x = np.repeat(tx[:, np.newaxis], branches, axis=1)
+            destinations_y = np.repeat(ty[:, np.newaxis], branches, axis=1)
+            self.probabilities[action, :, 0] = 1.0
+
+            for state in np.nonzero(teleport)[0]:
+                others = [position for position in portals if position != (tx[state], ty[state])]
+
+                destinations_x[state], destinations_y[state] = zip(*others)
+                self.probabilities[action, state] = 1.0 / len(others)
+
+            self.next_states[action] = (next_switched[:, np.newaxis] * self.width + destinations_x) * self.height + \
+                destinations_y
+            self.rewards[action] = rewards[self.tiles[destinations_x, destinations_y]] - GridWorld.PENALTY
+            self.terminals[action] = terminals[self.tiles[destinations_x, destinations_y]]
+
+    def iterate(self):
+        self.values = np.zeros([self.episode_length + 1, self.size])
+
+        for remaining in range(1, self.episode_length + 1):
+            self.values[remaining] = np.max(self.backup(self.values[remaining - 1]), axis=0)
+
+    def backup(self, values):
+        return np.sum(self.probabilities * (self.rewards + self.discount * np.logical_not(self.terminals) *
+                                            values[self.next_states]), axis=2)
+
+    def q_values(self, x, y, switched=False, t=0):
+        return self.backup(self.values[self.episode_length - t - 1])[:, self.index(x, y, switched)]
+
+    def value(self, x, y, switched=False, t=0):
+        return self.values[self.episode_length - t, self.index(x, y, switched)]
+
+    def state(self, world):
+        switched = self.switches > 1 and not np.any(world.frames[0, :, :, -1] == Switch.ID)
+
+        return world.agent.x, world.agent.y, switched, world.t()
+
+    def act(self, world):
+        return int(np.argmax(self.q_values(*self.state(world))))
+
+
+def solve(tiles, episode_length, discount=1.0):
+    tiles = np.array(tiles, dtype=np.int8)
+    key = (tiles.tostring(), tiles.shape, episode_length, discount)
+
+    if key not in CACHE:
+        CACHE[key] = Solver(tiles, episode_length, discount=discount)
+
+    return CACHE[key]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('world_paths', nargs='+')
+    parser.add_argument('--levels', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+
+    with open('params.json') as f:
+        params = json.load(f)
+
+    random.seed(args.seed)
+
+    for world_path in args.world_paths:
+        pool = LevelPool(load_entities(world_path), params['width'], params['height'], size=args.levels, seed=args.seed)
+        values, returns, deterministic = [], [], []
+
+        for i in range(args.levels):
+            solver = solve(pool.tiles[i], params['episode_length'])
+            stochastic = solver.probabilities.shape[2] > 1
+
+            for world in [pool.world(index=i), GridWorld(grid=[[CounterMetaClass.classes[tile] for tile in column]
+                                                               for column in pool.tiles[i]])]:
+                values.append(solver.value(world.agent.x, world.agent.y))
+
+                while not world.terminal() and world.t() < params['episode_length']:
+                    world.act(solver.act(world))
+
+                returns.append(world.total_reward())
+                deterministic.append(not stochastic)
+
+        errors = np.abs(np.array(values) - np.array(returns))[np.array(deterministic)]
+
+        print '%s: optimal reward %.3f, achieved %.3f, max deviation on deterministic levels %.6f' % \
+              (world_path, np.mean(values), np.mean(returns), np.max(errors) if len(errors) > 0 else 0.0)
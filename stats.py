@@ -0,0 +1,87 @@
+import numpy as np
+
+from collections import deque
+
+
+class RunningWindow:
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.count = 0
+
+    def append(self, value):
+        self.values.append(value)
+        self.total += value
+        self.count += 1
+
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+
+        if self.count % self.size == 0:
+            self.total = float(np.sum(self.values))
+
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / len(self.values)
+
+    def restore(self, values, count):
+        self.values = deque(values.tolist())
+        self.total = float(np.sum(values))
+        self.count = int(count)
+
+
+class RewardStatistics:
+    def __init__(self, window=5000, percentiles=None, percentile_step=100):
+        self.window = window
+        self.percentiles = percentiles
+        self.percentile_step = percentile_step
+        self.rewards = RunningWindow(window)
+        self.lengths = RunningWindow(window)
+        self.episodes = []
+        self.means = []
+        self.percentile_episodes = []
+        self.percentile_values = []
+        self.length_episodes = []
+        self.mean_lengths = []
+
+    def append(self, reward, length=None):
+        self.rewards.append(reward)
+
+        if self.rewards.full():
+            self.episodes.append(self.rewards.count - self.window // 2)
+            self.means.append(self.rewards.mean())
+
+            if self.percentiles is not None and self.rewards.count % self.percentile_step == 0:
+                self.percentile_episodes.append(self.rewards.count - self.window // 2)
+                self.percentile_values.append(np.percentile(self.rewards.values, self.percentiles))
+
+        if length is not None:
+            self.lengths.append(length)
+
+            if self.lengths.full():
+                self.length_episodes.append(self.rewards.count - self.window // 2)
+                self.mean_lengths.append(self.lengths.mean())
+
+    def state(self):
+        return {
+            'rewards': np.array(self.rewards.values), 'reward_count': self.rewards.count,
+            'lengths': np.array(self.lengths.values), 'length_count': self.lengths.count,
+            'episodes': np.array(self.episodes), 'means': np.array(self.means),
+            'percentile_episodes': np.array(self.percentile_episodes),
+            'percentile_values': np.array(self.percentile_values), 'length_episodes': np.array(self.length_episodes),
+            'mean_lengths': np.array(self.mean_lengths)
+        }
+
+    def restore(self, state):
+        self.rewards.restore(state['rewards'], state['reward_count'])
+        self.lengths.restore(state['lengths'], state['length_count'])
+        self.episodes = state['episodes'].tolist()
+        self.means = state['means'].tolist()
+        self.percentile_values = list(state['percentile_values'])
+        self.percentile_episodes = state['percentile_episodes'].tolist() if 'percentile_episodes' in state else \
+            self.episodes[:len(self.percentile_values)]
+        self.length_episodes = state['length_episodes'].tolist()
+        self.mean_lengths = state['mean_lengths'].tolist()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+
+
+WORLDS = ['goal', 'coin', 'water', 'fire', 'wall', 'portal', 'door']
+
+_slots = None
+_cores_per_job = 1
+_intra_op_threads = 0
+_inter_op_threads = 0
+
+
+def init_worker(slots, cores_per_job, intra_op_threads, inter_op_threads):
+    global _slots, _cores_per_job, _intra_op_threads, _inter_op_threads
+
+    _slots = slots
+    _cores_per_job = cores_per_job
+    _intra_op_threads = intra_op_threads
+    _inter_op_threads = inter_op_threads
+
+
+def pin(slot):
+    cores = range(slot * _cores_per_job, (slot + 1) * _cores_per_job)
+
+    with open(os.devnull, 'w') as devnull:
+        subprocess.call(['taskset', '-p', '-c', ','.join(map(str, cores)), str(os.getpid())], stdout=devnull)
+
+
+def finished(model_name):
+    params_path = os.path.join('models', model_name, 'params.json')
+
+    if not os.path.exists(params_path):
+        return False
+
+    with open(params_path) as f:
+        params = json.load(f)
+
+    return params['current_frame'] >= params['frames']
+
+
+def check_params(params_path='params.json'):
+    with open(params_path) as f:
+        params = json.load(f)
+
+    if params.get('actors', 0) > 0:
+        raise ValueError('Sweep workers are daemonic pool processes and cannot start actor processes; '
+                         'set "actors" to 0 in %s or run trainer.py directly.' % params_path)
+
+
+def run(job):
+    model_name, world_path, initial_weights, return_weights = job
+    params_path = os.path.join('models', model_name, 'params.json')
+
+    check_params(params_path if os.path.exists(params_path) else 'params.json')
+
+    if finished(model_name) and not return_weights:
+        print 'Skipping finished model %s.' % model_name
+
+        return model_name, None
+
+    slot = _slots.get()
+
+    try:
+        pin(slot)
+
+        from trainer import Trainer
+
+        trainer = Trainer(model_name=model_name, world_path=world_path, initial_weights=initial_weights,
+                          intra_op_threads=_intra_op_threads, inter_op_threads=_inter_op_threads)
+
+        if finished(model_name):
+            print 'Skipping finished model %s.' % model_name
+        else:
+            trainer.train()
+
+        if return_weights:
+            return model_name, dict(zip([variable.name for variable in trainer.variables],
+                                        trainer.sess.run(trainer.variables)))
+        else:
+            return model_name, None
+    finally:
+        _slots.put(slot)
+
+
+def jobs(worlds, seeds, prefix='final'):
+    return [('%s_%s_%d' % (prefix, world, i), 'world_%s.json' % world, None, False)
+            for i in range(1, seeds + 1) for world in worlds]
+
+
+def start_pool(processes, cores_per_job, intra_op_threads=None, inter_op_threads=None):
+    check_params()
+
+    slots = multiprocessing.Queue()
+
+    for slot in range(processes):
+        slots.put(slot)
+
+    return multiprocessing.Pool(processes, initializer=init_worker, maxtasksperchild=1,
+                                initargs=(slots, cores_per_job, intra_op_threads or cores_per_job,
+                                          inter_op_threads or 1))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--worlds', nargs='+', default=WORLDS)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--prefix', default='final')
+    parser.add_argument('--cores_per_job', type=int, default=1)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--intra_op_threads', type=int)
+    parser.add_argument('--inter_op_threads', type=int)
+
+    args = parser.parse_args()
+
+    processes = args.processes or max(multiprocessing.cpu_count() // args.cores_per_job, 1)
+    pool = start_pool(processes, args.cores_per_job, args.intra_op_threads, args.inter_op_threads)
+
+    for model_name, _ in pool.imap_unordered(run, jobs(args.worlds, args.seeds, args.prefix)):
+        print 'Finished model %s.' % model_name
+
+    pool.close()
+    pool.join()
@@ -1,23 +1,37 @@
 import tensorflow as tf
 import json
-import cPickle
 import os
-import matplotlib.pyplot as plt
-import pandas as pd
 import argparse
+import multiprocessing
+import Queue
 
 from gridworld import *
 from model import Network
-from collections import deque
+from inference import NumpyNetwork
+from actor import Actor, exploration_rate
+from replay import ReplayMemory
+from logger import Logger, BinaryLogger
+from stats import RewardStatistics
+from metrics import Metrics
+from learner import Learner, Prefetcher
+from levels import LevelPool
+from checkpoint import Checkpointer
 from shutil import copyfile
 
 
 class Trainer:
     def __init__(self, **kwargs):
+        self.start_time = time.time()
         self.model_name = kwargs.get('model_name', time.strftime('%Y_%m_%d_%H-%M-%S', time.gmtime()))
         self.curriculum_name = kwargs.get('curriculum_name', None)
+        self.initial_weights = kwargs.get('initial_weights', None)
+        self.param_overrides = kwargs.get('params', None) or {}
         self.display_flag = kwargs.get('display_flag', False)
+        self.headless = kwargs.get('headless', False)
+        self.record_flag = kwargs.get('record', False)
         self.verbose = kwargs.get('verbose', True)
+        self.intra_op_threads = kwargs.get('intra_op_threads', None) or 0
+        self.inter_op_threads = kwargs.get('inter_op_threads', None) or 0
 
         self.root_path = 'models'
         self.default_params_path = 'params.json'
@@ -25,22 +39,38 @@ class Trainer:
         self.results_path = os.path.join(self.root_path, self.model_name)
         self.model_path = os.path.join(self.results_path, 'model.ckpt')
         self.checkpoint_path = os.path.join(self.results_path, 'checkpoint')
+        self.checkpoints_path = os.path.join(self.results_path, 'checkpoints')
         self.params_path = os.path.join(self.results_path, 'params.json')
         self.world_path = os.path.join(self.results_path, self.default_world_path)
-        self.replay_memory_path = os.path.join(self.results_path, 'replay_memory.pickle')
+        self.replay_memory_path = os.path.join(self.results_path, 'replay_memory')
+        self.legacy_replay_memory_path = os.path.join(self.results_path, 'replay_memory.pickle')
         self.plot_path = os.path.join(self.results_path, 'rewards.png')
         self.episode_log_path = os.path.join(self.results_path, 'episodes.log')
         self.frame_log_path = os.path.join(self.results_path, 'frames.log')
-
-        self.sess = tf.InteractiveSession()
-
-        if os.path.exists(self.results_path):
-            self.load()
-        else:
-            self.initialize()
-
-        if self.display_flag:
-            self.display = Display(width=self.params['width'], height=self.params['height'])
+        self.frame_binary_log_path = os.path.join(self.results_path, 'frames.bin')
+        self.metrics_path = os.path.join(self.results_path, 'metrics.log')
+        self.recordings_path = os.path.join(self.results_path, 'recordings')
+
+        self.metrics = Metrics(self.metrics_path)
+        self.learner = None
+        self.prefetcher = None
+        self.pending_frames = 0
+        self.first_frame = True
+
+        self.sess = tf.InteractiveSession(config=tf.ConfigProto(intra_op_parallelism_threads=self.intra_op_threads,
+                                                                inter_op_parallelism_threads=self.inter_op_threads))
+
+        with self.metrics.time('startup'):
+            if os.path.exists(self.results_path):
+                self.load()
+            else:
+                self.initialize()
+
+        if self.display_flag or self.record_flag:
+            self.display_flag = True
+            self.display = Display(width=self.params['width'], height=self.params['height'],
+                                   headless=bool(self.headless),
+                                   record_path=self.recordings_path if self.record_flag else None)
 
     def initialize(self):
         if self.verbose:
@@ -54,27 +84,27 @@ class Trainer:
         with open(self.default_params_path) as f:
             self.params = json.load(f)
 
+        self.params.update(self.param_overrides)
+
         with open(self.default_world_path) as f:
             self.world = json.load(f)
 
-        self.entities = {}
-
-        for k, v in self.world.iteritems():
-            self.entities[eval(k)] = v
+        self.entities = parse_entities(self.world)
 
         self.params['model_name'] = self.model_name
         self.params['current_episode'] = 0
         self.params['current_frame'] = 0
         self.params['current_exploration_rate'] = self.params['initial_exploration_rate']
 
-        self.replay_memory = deque()
-        self.reward_history = []
-
-        with open(self.frame_log_path, 'w') as f:
-            f.write('frame,reward\n')
+        self.replay_memory = ReplayMemory(self.params['replay_memory_size'], self.params['width'],
+                                          self.params['height'], self.params['memory'],
+                                          streams=max(self.params.get('actors', 0), 1) *
+                                          self.params.get('environments', 1),
+                                          path=self.replay_memory_path,
+                                          codec=self.params.get('state_codec', 'uint8'))
+        self.init_statistics()
 
-        with open(self.episode_log_path, 'w') as f:
-            f.write('episode,reward\n')
+        self.init_logs()
 
         with open(self.params_path, 'w') as f:
             json.dump(self.params, f, indent=2, separators=(',', ': '))
@@ -82,9 +112,9 @@ class Trainer:
         with open(self.world_path, 'w') as f:
             json.dump(self.world, f, indent=2, separators=(',', ': '))
 
-        with open(self.replay_memory_path, 'wb') as f:
-            cPickle.dump(self.replay_memory, f)
+        self.replay_memory.save()
 
+        self.init_random()
         self.init_tf()
 
         if self.curriculum_name:
@@ -95,6 +125,10 @@ class Trainer:
 
             self.sess.run(tf.initialize_all_variables())
             self.restore()
+        elif self.initial_weights is not None:
+            self.sess.run(tf.initialize_all_variables())
+            self.restore_variables(self.initial_weights)
+            self.save()
         else:
             self.sess.run(tf.initialize_all_variables())
             self.save()
@@ -103,35 +137,114 @@ class Trainer:
         if self.verbose:
             print 'Loading model %s...' % self.model_name
 
-        with open(self.params_path) as f:
-            self.params = json.load(f)
+        checkpoint_path = Checkpointer.latest(self.checkpoints_path)
+
+        if checkpoint_path is not None:
+            checkpoint, self.params, variables = Checkpointer.load(checkpoint_path)
+            replay_meta = checkpoint['replay_memory']
+            statistics = Checkpointer.load_statistics(checkpoint_path)
+        else:
+            with open(self.params_path) as f:
+                self.params = json.load(f)
+
+            replay_meta = None
+            statistics = None
 
         with open(self.world_path) as f:
             self.world = json.load(f)
 
-        self.entities = {}
+        self.entities = parse_entities(self.world)
 
-        for k, v in self.world.iteritems():
-            self.entities[eval(k)] = v
+        if replay_meta is None and not os.path.exists(os.path.join(self.replay_memory_path, 'meta.json')) and \
+                os.path.exists(self.legacy_replay_memory_path):
+            self.convert_replay_memory()
+        else:
+            self.replay_memory = ReplayMemory.load(self.replay_memory_path, replay_meta)
+
+        self.init_statistics()
 
-        with open(self.replay_memory_path, 'rb') as f:
-            self.replay_memory = cPickle.load(f)
+        if statistics is not None:
+            self.statistics.restore(statistics)
+        else:
+            import pandas as pd
 
-        self.reward_history = list(pd.read_csv(self.episode_log_path)['reward'])
+            for reward in pd.read_csv(self.episode_log_path)['reward']:
+                self.statistics.append(reward)
 
+        self.init_logs()
+
+        self.init_random()
         self.init_tf()
-        self.restore()
+
+        if checkpoint_path is not None:
+            self.restore_variables(variables)
+        else:
+            self.restore()
+
+    def convert_replay_memory(self):
+        import cPickle
+
+        if self.verbose:
+            print 'Converting pickled replay memory of model %s...' % self.model_name
+
+        with open(self.legacy_replay_memory_path, 'rb') as f:
+            transitions = cPickle.load(f)
+
+        self.replay_memory = ReplayMemory.convert(transitions, self.params['replay_memory_size'], self.params['width'],
+                                                  self.params['height'], self.params['memory'],
+                                                  streams=max(self.params.get('actors', 0), 1) *
+                                                  self.params.get('environments', 1),
+                                                  path=self.replay_memory_path,
+                                                  codec=self.params.get('state_codec', 'uint8'))
+        self.replay_memory.save()
+
+    def init_statistics(self):
+        self.statistics = RewardStatistics(window=self.params.get('plot_window', 5000),
+                                           percentiles=self.params.get('plot_percentiles', None),
+                                           percentile_step=self.params.get('plot_percentile_step', 100))
+
+    def init_logs(self):
+        if self.params.get('frame_log_format', 'csv') == 'binary':
+            self.frame_log = BinaryLogger(self.frame_binary_log_path)
+        else:
+            self.frame_log = Logger(self.frame_log_path, 'frame,reward', '%d,%.2f')
+
+        self.episode_log = Logger(self.episode_log_path, 'episode,reward', '%d,%.2f')
+
+    def init_random(self):
+        if self.params.get('seed') is not None:
+            random.seed(self.params['seed'])
+            np.random.seed(self.params['seed'])
+            tf.set_random_seed(self.params['seed'])
+
+    def init_levels(self):
+        if self.params.get('level_pool', 0) <= 0:
+            return None
+
+        return LevelPool(self.entities, self.params['width'], self.params['height'], size=self.params['level_pool'],
+                         seed=self.params.get('seed') or 0)
 
     def init_tf(self):
         self.network = Network(input_shape=[self.params['width'], self.params['height'], self.params['memory']],
                                output_shape=[self.params['actions']])
 
-        self._actions = tf.placeholder(tf.float32, [None, self.params['actions']])
+        self._actions = tf.placeholder(tf.int32, [None])
         self._rewards = tf.placeholder(tf.float32, [None])
-        self._predicted_rewards = tf.reduce_sum(tf.mul(self.network.output, self._actions), reduction_indices=1)
+        self._predicted_rewards = tf.reduce_sum(tf.mul(self.network.output,
+                                                       tf.one_hot(self._actions, self.params['actions'])),
+                                                reduction_indices=1)
         self.cost = tf.reduce_mean(tf.square(self._rewards - self._predicted_rewards))
         self.train_step = tf.train.AdamOptimizer(learning_rate=self.params['learning_rate']).minimize(self.cost)
         self.saver = tf.train.Saver()
+        self.acting_network = NumpyNetwork()
+
+        self.variables = tf.all_variables()
+        self._values = [tf.placeholder(variable.dtype.base_dtype, variable.get_shape()) for variable in self.variables]
+        self._restore = [variable.assign(value) for variable, value in zip(self.variables, self._values)]
+
+        self.checkpointer = Checkpointer(self.checkpoints_path, keep=self.params.get('keep_checkpoints', 3),
+                                         max_pending=self.params.get('pending_checkpoints', 1))
+        self.checkpointer.start()
 
     def save(self):
         self.saver.save(self.sess, self.model_path)
@@ -139,113 +252,279 @@ class Trainer:
     def restore(self):
         self.saver.restore(self.sess, self.model_path)
 
+    def restore_variables(self, variables):
+        self.sess.run(self._restore, feed_dict=dict([(value, variables[variable.name])
+                                                     for variable, value in zip(self.variables, self._values)]))
+
+    def checkpoint(self):
+        self.wait_for_learner()
+
+        with self.metrics.time('checkpoint'):
+            self.frame_log.flush()
+            self.episode_log.flush()
+
+            self.checkpointer.save(self.params['current_episode'], [variable.name for variable in self.variables],
+                                   self.sess.run(self.variables), dict(self.params), self.replay_memory,
+                                   self.replay_memory.snapshot(), self.statistics.state())
+
     def train(self):
+        with self.metrics.time('generation'):
+            self.levels = self.init_levels()
+
+        if self.params.get('actors', 0) > 0:
+            self.train_distributed()
+        else:
+            self.train_local()
+
+        self.stop_learner()
+
+        if self.display_flag:
+            self.display.close()
+
+        self.checkpoint()
+        self.checkpointer.stop()
+
+        self.frame_log.close()
+        self.episode_log.close()
+
+        self.save()
+        self.plot()
+
+        with open(self.params_path, 'w') as f:
+            json.dump(self.params, f, indent=2, separators=(',', ': '))
+
+    def train_local(self):
+        environments = VectorGridWorld.from_params(self.params, self.entities, auto_reset=False, levels=self.levels)
+        states = environments.state()
+        numpy_inference = self.params.get('numpy_inference', False)
+        last_sync = None
+
         while self.params['current_frame'] < self.params['frames']:
-            gw = GridWorld(entities=self.entities, width=self.params['width'], height=self.params['height'])
+            with self.metrics.time('action'):
+                if numpy_inference:
+                    if last_sync is None or \
+                            self.params['current_frame'] - last_sync >= self.params.get('weight_sync_step', 1000):
+                        self.acting_network.sync(self.network, self.sess)
+                        last_sync = self.params['current_frame']
+
+                    predicted_rewards = self.acting_network.output(states)
+                else:
+                    predicted_rewards = self.network.output.eval(feed_dict={self.network.state: states})
+
+                actions = np.argmax(predicted_rewards, axis=1)
+
+                for i in range(environments.size):
+                    if random.random() <= self.params['current_exploration_rate']:
+                        actions[i] = random.randrange(self.params['actions'])
 
-            while True:
-                state = gw.state(memory=self.params['memory'])
-                predicted_rewards = self.network.output.eval(feed_dict={self.network.state: state})
+            if self.display_flag and self.params['current_episode'] % self.params['display_step'] == 0:
+                with self.metrics.time('display'):
+                    self.display.draw(environments.worlds[0], predicted_rewards[0], self.params['current_episode'])
 
-                if self.display_flag and self.params['current_episode'] % self.params['display_step'] == 0:
-                    self.display.draw(gw, predicted_rewards[0])
+                if not self.headless and not self.record_flag:
                     time.sleep(0.01)
 
-                if random.random() <= self.params['current_exploration_rate']:
-                    action = random.randrange(self.params['actions'])
+            with self.metrics.time('environment'):
+                rewards, terminals, next_states = environments.act(actions)
+
+            for i in range(environments.size):
+                self.observe(i, states[i, :, :, -1], actions[i], rewards[i], terminals[i])
+
+            for _, total_reward, t in environments.finished:
+                self.finish_episode(total_reward, t)
+
+            if len(environments.finished) > 0:
+                with self.metrics.time('generation'):
+                    environments.reset()
+
+                with self.metrics.time('state'):
+                    states = environments.state()
+            else:
+                states = next_states
+
+    def train_distributed(self):
+        environments = self.params.get('environments', 1)
+        frame_counter = multiprocessing.Value('l', self.params['current_frame'])
+        stop = multiprocessing.Event()
+        transitions = multiprocessing.Queue(maxsize=4 * self.params['actors'])
+        weights = [multiprocessing.Queue(maxsize=1) for _ in range(self.params['actors'])]
+        actors = [Actor(i, self.params, self.entities, transitions, weights[i], frame_counter, stop, self.levels)
+                  for i in range(self.params['actors'])]
+
+        for actor in actors:
+            actor.start()
+
+        self.broadcast(weights)
+        last_sync = self.params['current_frame']
+
+        while self.params['current_frame'] < self.params['frames']:
+            try:
+                with self.metrics.time('waiting'):
+                    index, frames, actions, rewards, terminals, finished = transitions.get(timeout=10.0)
+            except Queue.Empty:
+                if any([actor.is_alive() for actor in actors]):
+                    continue
                 else:
-                    action = np.argmax(predicted_rewards)
+                    break
 
-                reward = gw.act(action)
-                next_state = gw.state(memory=self.params['memory'])
+            for i in range(len(actions)):
+                self.observe(index * environments + i, frames[i], actions[i], rewards[i], terminals[i])
 
-                with open(self.frame_log_path, 'a') as f:
-                    f.write('%d,%.2f\n' % (self.params['current_frame'], reward))
+            for total_reward, t in finished:
+                self.finish_episode(total_reward, t)
 
-                terminal = (True if (gw.terminal() or gw.t() >= self.params['episode_length']) else False)
+            if self.params['current_frame'] - last_sync >= self.params.get('weight_sync_step', 1000):
+                with self.metrics.time('broadcast'):
+                    self.broadcast(weights)
 
-                self.replay_memory.append((state, action, reward, next_state, terminal))
+                last_sync = self.params['current_frame']
 
-                if len(self.replay_memory) >= self.params['replay_memory_size']:
-                    self.replay_memory.popleft()
+        stop.set()
 
-                if self.params['current_frame'] >= self.params['replay_start']:
-                    batch = random.sample(self.replay_memory, self.params['batch_size'])
+        for actor in actors:
+            actor.join(timeout=10.0)
 
-                    states = [b[0] for b in batch]
-                    rewards = [b[2] for b in batch]
-                    actions = []
+            if actor.is_alive():
+                actor.terminate()
 
-                    for i in range(len(batch)):
-                        actions.append(np.zeros([self.params['actions']]))
-                        actions[i][batch[i][1]] = 1
+    def broadcast(self, queues):
+        weights = self.network.get_weights(self.sess)
 
-                        if not batch[i][4]:
-                            rewards[i] += self.params['reward_decay'] * np.max(
-                                self.network.output.eval(feed_dict={self.network.state: batch[i][3]}))
+        for queue in queues:
+            try:
+                queue.get_nowait()
+            except Queue.Empty:
+                pass
 
-                    states = np.reshape(states, [-1, self.params['width'], self.params['height'],
-                                                 self.params['memory']])
+            try:
+                queue.put_nowait(weights)
+            except Queue.Full:
+                pass
 
-                    self.train_step.run(feed_dict={self._actions: actions, self._rewards: rewards,
-                                                   self.network.state: states})
+    def observe(self, stream, frame, action, reward, terminal):
+        if self.first_frame:
+            self.first_frame = False
+            self.metrics.set('time_to_first_frame', time.time() - self.start_time)
 
-                self.params['current_frame'] += 1
+            if self.verbose:
+                print 'Time to first frame: %.2fs' % (time.time() - self.start_time)
 
-                if self.params['current_frame'] <= self.params['exploration_rate_decay']:
-                    self.params['current_exploration_rate'] = self.params['initial_exploration_rate'] + \
-                                                              self.params['current_frame'] * \
-                                                              (self.params['final_exploration_rate'] -
-                                                               self.params['initial_exploration_rate']) \
-                                                              / float(self.params['exploration_rate_decay'])
+        with self.metrics.time('logging'):
+            self.frame_log.log(self.params['current_frame'], reward)
 
-                if terminal:
-                    with open(self.episode_log_path, 'a') as f:
-                        f.write('%d,%.2f\n' % (self.params['current_episode'], gw.total_reward()))
+        with self.metrics.time('replay'):
+            self.replay_memory.append(frame, action, reward, terminal, stream=stream)
 
-                    self.reward_history.append(gw.total_reward())
+        if self.params['current_frame'] >= self.params['replay_start']:
+            self.pending_frames += 1
 
-                    if self.params['current_episode'] % self.params['display_step'] == 0:
-                        self.plot()
+            if self.pending_frames >= self.params.get('train_frames', 1) and \
+                    self.replay_memory.sampleable() >= self.params['batch_size']:
+                self.pending_frames = 0
+                self.schedule_training(self.params.get('train_steps', 1))
 
-                    break
+        self.metrics.count('frames')
+        self.params['current_frame'] += 1
+        self.params['current_exploration_rate'] = exploration_rate(self.params, self.params['current_frame'])
 
-            print 'Episode #%d: total reward of %.2f in %d steps, with exploration rate %.2f' % \
-                  (self.params['current_episode'], gw.total_reward(), gw.t(), self.params['current_exploration_rate'])
+    def sample_batch(self):
+        with self.metrics.time('sampling'):
+            return self.replay_memory.sample(self.params['batch_size'])
 
-            if self.params['current_episode'] % self.params['save_step'] == 0:
-                print 'Saving model...'
+    def train_batch(self, batch):
+        states, actions, rewards, next_states, terminals = batch
 
-                with open(self.params_path, 'w') as f:
-                    json.dump(self.params, f, indent=2, separators=(',', ': '))
+        with self.metrics.time('targets'):
+            next_rewards = self.sess.run(self.network.output, feed_dict={self.network.state: next_states})
 
-                with open(self.replay_memory_path, 'wb') as f:
-                    cPickle.dump(self.replay_memory, f)
+            rewards += self.params['reward_decay'] * np.max(next_rewards, axis=1) * np.logical_not(terminals)
 
-                self.save()
+        with self.metrics.time('train_step'):
+            self.sess.run(self.train_step, feed_dict={self._actions: actions, self._rewards: rewards,
+                                                      self.network.state: states})
 
-            self.params['current_episode'] += 1
+        self.metrics.count('gradient_steps')
 
-        self.save()
-        self.plot()
+    def schedule_training(self, steps):
+        prefetch = self.params.get('prefetch', 0)
 
-        with open(self.params_path, 'w') as f:
-            json.dump(self.params, f, indent=2, separators=(',', ': '))
+        if prefetch <= 0:
+            for _ in range(steps):
+                self.train_batch(self.sample_batch())
+
+            return
+
+        if self.learner is None:
+            self.prefetcher = Prefetcher(self.sample_batch, size=prefetch)
+            self.learner = Learner(self.train_batch, self.prefetcher.get, max_pending=steps + prefetch)
+
+            self.prefetcher.start()
+            self.learner.start()
+
+        with self.metrics.time('learner_wait'):
+            self.learner.schedule(steps)
+
+    def wait_for_learner(self):
+        if self.learner is not None:
+            with self.metrics.time('learner_wait'):
+                self.learner.wait()
+
+    def stop_learner(self):
+        if self.learner is not None:
+            self.learner.stop()
+            self.prefetcher.stop()
+
+            self.learner = None
+            self.prefetcher = None
+
+    def finish_episode(self, total_reward, t):
+        with self.metrics.time('logging'):
+            self.episode_log.log(self.params['current_episode'], total_reward)
+
+        self.statistics.append(total_reward, t)
+        self.metrics.count('episodes')
+
+        if self.params['current_episode'] % self.params['display_step'] == 0:
+            with self.metrics.time('plotting'):
+                self.plot()
+
+        print 'Episode #%d: total reward of %.2f in %d steps, with exploration rate %.2f' % \
+              (self.params['current_episode'], total_reward, t, self.params['current_exploration_rate'])
+
+        if self.params['current_episode'] % self.params.get('metrics_step', 100) == 0:
+            self.report_metrics()
+
+        if self.params['current_episode'] % self.params['save_step'] == 0:
+            print 'Saving model...'
+
+            self.checkpoint()
+
+        self.params['current_episode'] += 1
+
+    def report_metrics(self):
+        self.metrics.set('replay_size', len(self.replay_memory))
+        self.metrics.set('bytes_written', self.frame_log.bytes_written + self.episode_log.bytes_written)
+
+        print 'Metrics: %s' % self.metrics.summary(self.metrics.report())
+
+    def plot(self):
+        if not self.params.get('plot', True) or len(self.statistics.means) == 0:
+            return
+
+        import matplotlib.pyplot as plt
 
-        with open(self.replay_memory_path, 'wb') as f:
-            cPickle.dump(self.replay_memory, f)
+        plt.figure()
+        plt.plot(self.statistics.episodes, self.statistics.means)
 
-    def plot(self, window=5000):
-        episodes = range(window / 2, len(self.reward_history) - window / 2)
-        means = [np.mean(self.reward_history[(i - window / 2):(i + window / 2)]) for i in episodes]
+        if len(self.statistics.percentile_values) > 0:
+            percentile_values = np.array(self.statistics.percentile_values)
+            plt.fill_between(self.statistics.percentile_episodes, percentile_values[:, 0], percentile_values[:, -1],
+                             alpha=0.3)
 
-        if len(means) > 0:
-            plt.figure()
-            plt.plot(episodes, means)
-            plt.xlabel('episode')
-            plt.ylabel('reward')
-            plt.savefig(self.plot_path)
-            plt.close()
+        plt.xlabel('episode')
+        plt.ylabel('reward')
+        plt.savefig(self.plot_path)
+        plt.close()
 
 
 if __name__ == '__main__':
@@ -253,8 +532,12 @@ if __name__ == '__main__':
     parser.add_argument('--model_name')
     parser.add_argument('--curriculum_name')
     parser.add_argument('--world_path')
-    parser.add_argument('--display')
+    parser.add_argument('--display', dest='display_flag')
+    parser.add_argument('--headless')
+    parser.add_argument('--record')
     parser.add_argument('--verbose')
+    parser.add_argument('--intra_op_threads', type=int)
+    parser.add_argument('--inter_op_threads', type=int)
 
     trainer = Trainer(**vars(parser.parse_args()))
     trainer.train()